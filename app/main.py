@@ -1,21 +1,36 @@
-from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, Body, HTTPException
+from typing import Dict, Optional
+from fastapi import FastAPI, Body, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+import aiofiles
+import asyncio
+import hashlib
 import os
-from .tts import textospeech
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from uuid import uuid4
+from .settings import settings, SUPPORTED_LANGS
+from .tts import edge_stream, synthesize, textospeech
 
 class TTSRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     text: str
     lang: Optional[str] = None
     translate: Optional[bool] = Field(True, description="Whether to translate text to target language before TTS")
     provider: Optional[str] = Field(None, description="Force specific TTS provider: edge, gtts, pyttsx3, elevenlabs, auto")
     voice_id: Optional[str] = Field(None, description="Optional voice ID (currently used for ElevenLabs)")
+    stream: Optional[bool] = Field(False, description="Return the audio bytes directly instead of a JSON with a URL")
 
 
 class TTSResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     audio_url: str
     filename: str
     original_text: str
@@ -31,13 +46,169 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create audio directory if it doesn't exist
-AUDIO_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "audio_files")
+# Create audio directory if it doesn't exist. AUDIO_DIR can be pointed at a
+# tmpfs mount (e.g. /dev/shm/audio_files) so writes/reads never touch disk.
+AUDIO_DIR = os.environ.get("AUDIO_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "audio_files"
+)
 os.makedirs(AUDIO_DIR, exist_ok=True)
+AUDIO_ROOT = Path(AUDIO_DIR).resolve()
+
+
+@lru_cache(maxsize=4096)
+def _audio_path(filename: str) -> Path:
+    """Resolve a filename inside AUDIO_ROOT, rejecting path traversal."""
+    path = (AUDIO_ROOT / filename).resolve()
+    if path.parent != AUDIO_ROOT:
+        raise HTTPException(status_code=404, detail="Audio file not found")
+    return path
+
 
 # Mount static files for serving audio
 app.mount("/audio", StaticFiles(directory=AUDIO_DIR), name="audio")
 
+# Cap on total bytes kept in AUDIO_DIR before least-recently-served files
+# are evicted (default 512 MB).
+MAX_AUDIO_BYTES = int(os.environ.get("MAX_AUDIO_BYTES", 512 * 1024 * 1024))
+
+# Cached audio older than this is purged by a background task (0 disables).
+AUDIO_MAX_AGE_DAYS = float(os.environ.get("AUDIO_MAX_AGE_DAYS", 7))
+
+
+class AudioLRU:
+    """Bounded LRU over the files in AUDIO_DIR, keyed filename -> size.
+
+    The purge task mutates the map from a worker thread while request
+    handlers mutate it on the event loop, so every mutation takes _lock.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def populate(self) -> None:
+        """Scan AUDIO_DIR at startup, oldest-accessed files first."""
+        entries = [e for e in os.scandir(AUDIO_DIR) if e.is_file()]
+        entries.sort(key=lambda e: e.stat().st_atime)
+        for entry in entries:
+            self.add(entry.name, entry.stat().st_size)
+
+    def add(self, filename: str, size: int) -> None:
+        with self._lock:
+            if filename in self._files:
+                self.total_bytes -= self._files[filename]
+            self._files[filename] = size
+            self._files.move_to_end(filename)
+            self.total_bytes += size
+            self._evict()
+
+    def touch(self, filename: str) -> None:
+        with self._lock:
+            if filename in self._files:
+                self._files.move_to_end(filename)
+
+    def purge_older_than(self, max_age_seconds: float) -> None:
+        """Drop (and unlink) cached files whose mtime is past the cutoff."""
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            snapshot = list(self._files)
+        for filename in snapshot:
+            path = os.path.join(AUDIO_DIR, filename)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                os.unlink(path)
+            except FileNotFoundError:
+                pass  # already gone (e.g. evicted); just drop the entry
+            except OSError:
+                continue  # couldn't stat/unlink; keep tracking the file
+            with self._lock:
+                # Entry may have been evicted since the snapshot
+                self.total_bytes -= self._files.pop(filename, 0)
+
+    def _evict(self) -> None:
+        # Caller holds _lock
+        while self.total_bytes > self.max_bytes and self._files:
+            victim, size = self._files.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.unlink(os.path.join(AUDIO_DIR, victim))
+            except OSError:
+                pass
+
+
+audio_lru = AudioLRU(MAX_AUDIO_BYTES)
+
+
+@app.on_event("startup")
+def _populate_audio_lru() -> None:
+    audio_lru.populate()
+
+
+# Module-level reference so the purge task isn't garbage-collected
+# mid-flight and can be cancelled on shutdown.
+_purge_task: Optional["asyncio.Task[None]"] = None
+
+
+@app.on_event("startup")
+async def _start_audio_purge() -> None:
+    global _purge_task
+    if AUDIO_MAX_AGE_DAYS <= 0:
+        return
+
+    async def _purge_loop() -> None:
+        while True:
+            # The scan stats/unlinks synchronously, so run it in a worker
+            # thread rather than on the event loop.
+            await asyncio.to_thread(audio_lru.purge_older_than, AUDIO_MAX_AGE_DAYS * 86400)
+            await asyncio.sleep(3600)
+
+    _purge_task = asyncio.create_task(_purge_loop())
+
+
+@app.on_event("shutdown")
+async def _stop_audio_purge() -> None:
+    if _purge_task is not None:
+        _purge_task.cancel()
+
+
+# Single-flight map: keys currently being synthesized. Concurrent identical
+# requests await the first caller's future instead of each paying the full
+# synthesis cost (and share its failure if synthesis raises).
+_inflight: Dict[str, "asyncio.Future[str]"] = {}
+
+# Cap on concurrent ElevenLabs synthesis calls so a burst of distinct
+# requests doesn't exhaust worker threads or trip upstream rate limits.
+_synth_semaphore = asyncio.Semaphore(int(os.environ.get("MAX_CONCURRENT_SYNTH", 8)))
+
+
+def _resolve_lang(lang: Optional[str]) -> str:
+    """Normalize a requested language, falling back to English if unsupported."""
+    lang = lang or settings.DEFAULT_LANG
+    if lang in SUPPORTED_LANGS:
+        # Fast path: already a canonical lowercase code, skip the .lower()
+        return lang
+    lang = lang.lower()
+    return lang if lang in SUPPORTED_LANGS else "en"
+
+
+def _cache_key(text: str, lang: str, provider: str, voice_id: str = "") -> str:
+    """Content-addressed cache key for a TTS request.
+
+    Provider and voice are part of the hashed material so a cached file is
+    only reused for requests that would produce identical audio.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    # Feed the hash piecewise: the (potentially multi-KB) text is encoded
+    # exactly once, with no intermediate joined string to build and copy.
+    for part in (provider, voice_id, lang):
+        h.update(part.encode())
+        h.update(b"|")
+    h.update(text.strip().encode())
+    return h.hexdigest()
+
 
 @app.get("/")
 def root():
@@ -47,37 +218,124 @@ def root():
 
 
 @app.post("/api/tts", response_model=TTSResponse)
-async def tts_api(req: TTSRequest = Body(...)) -> TTSResponse:
+async def tts_api(req: TTSRequest = Body(...)):
     """
     Enhanced TTS endpoint that can translate text before synthesis
-    
+
     Parameters:
     - text: The text to convert to speech
     - lang: Target language for speech (and optionally translation)
     - translate: Whether to translate the text to target language first (default: True)
+    - stream: Return the audio in this response instead of a URL, saving the
+      client a second round-trip to fetch the file
     """
 
+    language = _resolve_lang(req.lang)
+    provider = (req.provider or "elevenlabs").lower()
+    key = _cache_key(req.text, language, provider, req.voice_id or "")
+    base = f"tts_{language}_{key}"
 
-    filename = textospeech(req.text)
-    audio_url = f"/audio/{filename}"
-    return TTSResponse(
-        audio_url=audio_url,
+    # Cache hit: identical (provider, voice, lang, text) was already synthesized.
+    filename = next(
+        (f"{base}.{ext}" for ext in ("mp3", "wav") if _audio_path(f"{base}.{ext}").exists()),
+        None,
+    )
+    if filename is not None:
+        audio_lru.touch(filename)
+    else:
+        pending = _inflight.get(key)
+        if pending is not None:
+            # Someone else is synthesizing this exact request; share its result.
+            filename = await pending
+        else:
+            fut: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+            _inflight[key] = fut
+            try:
+                async with _synth_semaphore:
+                    if provider == "elevenlabs":
+                        # textospeech blocks on the ElevenLabs call and the
+                        # disk write, so run it in a worker thread to keep
+                        # the event loop free for other requests.
+                        filename = f"{base}.mp3"
+                        await asyncio.to_thread(
+                            textospeech, req.text, filename=filename, voice_id=req.voice_id
+                        )
+                    else:
+                        audio, mime, _, _, beep_generated = await synthesize(
+                            req.text, language, provider=provider, voice_id=req.voice_id
+                        )
+                        if audio is None:
+                            raise HTTPException(status_code=400, detail="Empty text provided")
+                        if beep_generated:
+                            # Placeholder beep from a failed/missing provider:
+                            # store it under a one-off name so a transient
+                            # outage is never served as a cache hit later.
+                            filename = f"beep_{uuid4().hex}.wav"
+                        else:
+                            filename = f"{base}.{'mp3' if mime == 'audio/mpeg' else 'wav'}"
+                        # Async write so the event loop isn't blocked on disk I/O
+                        async with aiofiles.open(_audio_path(filename), "wb") as f:
+                            await f.write(audio)
+                audio_lru.add(filename, _audio_path(filename).stat().st_size)
+            except Exception as exc:
+                fut.set_exception(exc)
+                # Mark the exception retrieved; without a concurrent waiter
+                # asyncio would log "Future exception was never retrieved"
+                # on every failed synthesis.
+                fut.exception()
+                raise
+            else:
+                fut.set_result(filename)
+            finally:
+                _inflight.pop(key, None)
+
+    file_path = _audio_path(filename)
+    if req.stream:
+        media_type = "audio/mpeg" if filename.endswith(".mp3") else "audio/wav"
+        return FileResponse(file_path, media_type=media_type)
+
+    # All three fields are strings we just built, so skip Pydantic's
+    # validation pass on the way out.
+    return TTSResponse.model_construct(
+        audio_url=f"/audio/{filename}",
         filename=filename,
         original_text=req.text,
-        
     )
 
    
 
+@app.post("/api/tts/stream")
+async def tts_stream_api(req: TTSRequest = Body(...)):
+    """Stream Edge TTS audio as it is synthesized.
+
+    Time-to-first-byte is one chunk instead of the full synthesis; the
+    trade-off is that nothing is written to the audio cache.
+    """
+    if not req.text.strip():
+        raise HTTPException(status_code=400, detail="Empty text provided")
+
+    language = _resolve_lang(req.lang)
+    return StreamingResponse(edge_stream(req.text, language), media_type="audio/mpeg")
+
+
 @app.get("/api/audio/{filename}")
-async def get_audio_file(filename: str):
+async def get_audio_file(filename: str, request: Request):
     """Serve audio file directly with proper headers"""
-    file_path = os.path.join(AUDIO_DIR, filename)
-    if not os.path.exists(file_path):
+    file_path = _audio_path(filename)
+    if not file_path.exists():
         raise HTTPException(status_code=404, detail="Audio file not found")
 
-    return FileResponse(
-        file_path,
-        media_type="audio/mpeg",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
\ No newline at end of file
+    audio_lru.touch(filename)
+
+    # Filenames are content-addressed, so cached copies never go stale;
+    # a matching ETag lets repeat downloads short-circuit with a 304.
+    stat = file_path.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    # Inline disposition (the default) lets browsers play the file directly
+    # and lets FileResponse satisfy Range requests for <audio> seeking.
+    media_type = "audio/mpeg" if filename.endswith(".mp3") else "audio/wav"
+    return FileResponse(file_path, media_type=media_type, headers=headers)
\ No newline at end of file
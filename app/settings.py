@@ -0,0 +1,23 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """App configuration loaded from the environment (or a .env file)."""
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    DEFAULT_LANG: str = "en"
+    ELEVENLABS_API_KEY: str = ""
+    ELEVENLABS_DEFAULT_VOICE_ID: str = ""
+    GEMINI_API_KEY: str = ""
+    GEMINI_MODEL: str = "gemini-1.5-flash"
+
+
+settings = Settings()
+
+# Languages the TTS layer has voices for. A frozenset so per-request
+# membership checks are O(1) hash lookups.
+SUPPORTED_LANGS = frozenset({
+    "en", "es", "fr", "de", "it", "pt", "ru", "zh", "ja", "ar", "hi",
+    "bn", "ur", "fa", "nl", "pl", "sv", "no", "da", "fi", "hu", "tr",
+})
@@ -1,42 +1,331 @@
+import asyncio
+import logging
 import os
+import tempfile
+import time
+from typing import Dict, Final, List, Optional, Tuple
 from uuid import uuid4
+
 from elevenlabs import ElevenLabs
 from dotenv import load_dotenv
 
+from .settings import settings
+
 load_dotenv()  # Load environment variables from .env file if present
 
+logger = logging.getLogger("app.tts")
+
+# Edge TTS neural voice per supported language; built once at import.
+_EDGE_VOICES: Final[Dict[str, str]] = {
+    "en": "en-US-JennyNeural",
+    "es": "es-ES-ElviraNeural",
+    "fr": "fr-FR-DeniseNeural",
+    "de": "de-DE-KatjaNeural",
+    "it": "it-IT-IsabellaNeural",
+    "pt": "pt-BR-FranciscaNeural",
+    "ru": "ru-RU-SvetlanaNeural",
+    "zh": "zh-CN-XiaoxiaoNeural",
+    "ja": "ja-JP-NanamiNeural",
+    "ar": "ar-EG-SalmaNeural",
+    "hi": "hi-IN-SwaraNeural",
+    "bn": "bn-BD-NabanitaNeural",
+    "ur": "ur-PK-AsadNeural",
+    "fa": "fa-IR-DilaraNeural",
+    "nl": "nl-NL-ColetteNeural",
+    "pl": "pl-PL-AgnieszkaNeural",
+    "sv": "sv-SE-HilleviNeural",
+    "no": "nb-NO-IselinNeural",
+    "da": "da-DK-ChristelNeural",
+    "fi": "fi-FI-NooraNeural",
+    "hu": "hu-HU-NoemiNeural",
+    "tr": "tr-TR-AhmetNeural",
+}
+
 
 # Ensure audio is saved inside the project's audio_files directory
-AUDIO_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "audio_files")
+# (or wherever AUDIO_DIR points, e.g. a tmpfs mount — keep in sync with main.py)
+AUDIO_DIR = os.environ.get("AUDIO_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "audio_files"
+)
 os.makedirs(AUDIO_DIR, exist_ok=True)
 
+# Single client reused across requests so the underlying HTTP connection
+# pool (and its TLS handshakes) is shared instead of rebuilt per call.
+_client: Optional[ElevenLabs] = None
+
+
+def _get_client(api_key: Optional[str] = None) -> ElevenLabs:
+    global _client
+    if _client is None:
+        api_key = api_key or settings.ELEVENLABS_API_KEY or os.getenv("ELEVENLABS_API_KEY", "")
+        if not api_key:
+            raise RuntimeError("ELEVENLABS_API_KEY is not set in environment")
+        _client = ElevenLabs(api_key=api_key)
+    return _client
+
+
+def _build_beep(sample_rate: int = 44100, duration: float = 0.5, frequency: int = 440) -> bytes:
+    """Build the placeholder beep WAV served when every provider fails."""
+    import struct
+
+    num_samples = int(sample_rate * duration)
+
+    try:
+        # Vectorized: one NumPy expression instead of 22k Python iterations
+        import numpy as np
+
+        t = np.arange(num_samples, dtype=np.float32) / sample_rate
+        pcm = (32767 * np.sin(2 * np.pi * frequency * t)).astype(np.int16).tobytes()
+    except ImportError:
+        import math
 
-def textospeech(text: str) -> str:
+        pcm = b''.join(
+            struct.pack('<h', int(32767 * math.sin(2 * math.pi * frequency * i / sample_rate)))
+            for i in range(num_samples)
+        )
+
+    wav_header = struct.pack('<4sI4s', b'RIFF', 36 + len(pcm), b'WAVE')
+    wav_header += struct.pack('<4sIHHIIHH', b'fmt ', 16, 1, 1, sample_rate,
+                              sample_rate * 2, 2, 16)
+    wav_header += struct.pack('<4sI', b'data', len(pcm))
+    return wav_header + pcm
+
+
+# The placeholder signal never changes, so synthesize it once at import time
+# and hand out the same bytes object on every fallback.
+_BEEP_WAV = _build_beep()
+
+
+def textospeech(text: str, filename: Optional[str] = None, voice_id: Optional[str] = None) -> str:
     """Convert text to speech using ElevenLabs and save into audio_files/.
 
     Returns the generated filename (basename only) so it can be served via /audio/{filename}.
+    If no filename is given a random one is generated; if no voice_id is
+    given the configured/default voice is used.
     Requires ELEVENLABS_API_KEY in the environment (or configure via .env).
     """
 
-    api_key = os.getenv("ELEVENLABS_API_KEY")
-    if not api_key:
-        raise RuntimeError("ELEVENLABS_API_KEY is not set in environment")
-
-    client = ElevenLabs(api_key=api_key)
+    client = _get_client()
 
     audio = client.text_to_speech.convert(
-        voice_id="JBFqnCBsd6RMkjVDRZzb",  # Example voice
+        voice_id=voice_id or settings.ELEVENLABS_DEFAULT_VOICE_ID or "JBFqnCBsd6RMkjVDRZzb",
         output_format="mp3_44100_128",
         text=text,
         model_id="eleven_multilingual_v2",
     )
 
     # Save the audio file inside audio_files/
-    filename = f"{uuid4()}.mp3"
+    if filename is None:
+        filename = f"{uuid4()}.mp3"
     file_path = os.path.join(AUDIO_DIR, filename)
+    # Join the streamed chunks and write once instead of one call per chunk
+    data = b"".join(audio)
     with open(file_path, "wb") as f:
-        for chunk in audio:
-            f.write(chunk)
+        f.write(data)
 
     print(f"Audio saved as {file_path}")
-    return filename
\ No newline at end of file
+    return filename
+
+
+async def edge_stream(text: str, lang: str):
+    """Yield Edge TTS audio chunks as they arrive.
+
+    Suitable for wrapping in a StreamingResponse: the first chunk is
+    available long before full synthesis finishes. Requires edge-tts.
+    """
+    import edge_tts
+
+    voice = _EDGE_VOICES.get((lang or "en").lower(), "en-US-JennyNeural")
+    communicate = edge_tts.Communicate(text.strip(), voice)
+    async for msg in communicate.stream():
+        if msg["type"] == "audio":
+            yield msg["data"]
+
+
+async def synthesize(text: str, lang: str, provider: Optional[str] = None, voice_id: Optional[str] = None) -> Tuple[Optional[bytes], str, str, List[str], bool]:
+    """Synthesize speech.
+
+    Order of attempts (unless provider forces a specific one):
+    1. Edge TTS (websocket) with retry/backoff on transient errors (403, network)
+    2. gTTS (HTTP) if installed (short texts best)
+    3. pyttsx3 offline engine
+    4. Generated placeholder beep (WAV)
+
+    Returns (audio_bytes, mime_type, provider_used, attempted_sequence, beep_generated) or (None, "", "", [], False) when empty input.
+    """
+
+    # Clean inputs
+    text = text.strip()
+    lang = (lang or "en").lower()
+
+    if not text:
+        logger.warning("Empty text provided to TTS")
+        return None, "", "", [], False
+
+    logger.info(f"TTS Request: text='{text[:50]}...', lang={lang}, provider={provider}")
+
+    # Helper for provider ordering
+    requested = (provider or "auto").lower()
+
+    async def try_edge_tts() -> Optional[Tuple[bytes, str]]:
+        try:
+            import edge_tts
+            from aiohttp.client_exceptions import WSServerHandshakeError
+
+            voice = _EDGE_VOICES.get(lang, "en-US-JennyNeural")
+            attempts = 3
+            base_delay = 0.6
+            for attempt in range(1, attempts + 1):
+                logger.info(f"Edge TTS attempt {attempt}/{attempts} voice={voice}")
+                communicate = edge_tts.Communicate(text, voice)
+                try:
+                    # Accumulate audio chunks in memory; no tempfile round-trip
+                    chunks: List[bytes] = []
+                    async for msg in communicate.stream():
+                        if msg["type"] == "audio":
+                            chunks.append(msg["data"])
+                    audio_data = b"".join(chunks)
+                    if audio_data:
+                        logger.info(f"Edge TTS SUCCESS bytes={len(audio_data)}")
+                        return audio_data, "audio/mpeg"
+                    logger.warning("Edge TTS produced no audio; will retry")
+                except WSServerHandshakeError as wse:
+                    logger.warning(f"Edge TTS handshake error (likely 403) attempt={attempt}: {wse}")
+                except Exception as e:
+                    logger.warning(f"Edge TTS generic failure attempt={attempt}: {e}")
+                if attempt < attempts:
+                    await asyncio.sleep(base_delay * attempt)
+        except ImportError:
+            logger.error("edge-tts not installed (pip install edge-tts)")
+        except Exception as e:
+            logger.error(f"Edge TTS fatal error: {e}", exc_info=True)
+        return None
+
+    async def try_gtts() -> Optional[Tuple[bytes, str]]:
+        try:
+            from gtts import gTTS
+            # gTTS best for <= 500 chars; if longer, we chunk
+            max_chunk = 400
+            chunks = []
+            remaining = text
+            while remaining:
+                chunk = remaining[:max_chunk]
+                remaining = remaining[max_chunk:]
+                chunks.append(chunk)
+            temp_files = []
+            for idx, chunk in enumerate(chunks):
+                tts_obj = gTTS(chunk, lang=lang if len(lang) == 2 else "en")
+                tmp = tempfile.NamedTemporaryFile(suffix=f"_{idx}.mp3", delete=False)
+                temp_files.append(tmp.name)
+                tmp.close()
+                tts_obj.save(temp_files[-1])
+            # Concatenate binary (note: naive; MP3 headers remain, but most players handle)
+            audio_data = b"".join(open(f, "rb").read() for f in temp_files)
+            for f in temp_files:
+                try:
+                    os.remove(f)
+                except OSError:
+                    pass
+            if audio_data:
+                logger.info(f"gTTS SUCCESS bytes={len(audio_data)} chunks={len(chunks)}")
+                return audio_data, "audio/mpeg"
+        except ImportError:
+            logger.info("gTTS not installed")
+        except Exception as e:
+            logger.warning(f"gTTS failed: {e}")
+        return None
+
+    async def try_pyttsx3() -> Optional[Tuple[bytes, str]]:
+        try:
+            import pyttsx3
+            logger.info("Trying pyttsx3 fallback")
+            engine = pyttsx3.init()
+            engine.setProperty("rate", 180)
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+                temp_path = tmp.name
+            try:
+                engine.save_to_file(text, temp_path)
+                engine.runAndWait()
+                # Ensure callbacks flush
+                time.sleep(0.05)
+                if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
+                    with open(temp_path, "rb") as f:
+                        audio_data = f.read()
+                    logger.info(f"pyttsx3 SUCCESS bytes={len(audio_data)}")
+                    return audio_data, "audio/wav"
+            finally:
+                try:
+                    engine.stop()
+                except Exception:
+                    pass
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        except ImportError:
+            logger.info("pyttsx3 not installed")
+        except Exception as e:
+            logger.warning(f"pyttsx3 failed: {e}")
+        return None
+
+    async def try_elevenlabs() -> Optional[Tuple[bytes, str]]:
+        """High quality voices from ElevenLabs (paid/free tier with API key).
+        Requires env ELEVENLABS_API_KEY. Optionally override voice via voice_id param or ELEVENLABS_DEFAULT_VOICE_ID setting/env.
+        """
+        # Prefer settings (loaded from .env) then raw env for backward compatibility
+        api_key = settings.ELEVENLABS_API_KEY or os.getenv("ELEVENLABS_API_KEY", "")
+        if not api_key:
+            logger.info("ElevenLabs API key not set; skipping")
+            return None
+
+        chosen_voice = voice_id or settings.ELEVENLABS_DEFAULT_VOICE_ID or os.getenv("ELEVENLABS_VOICE_ID", "JBFqnCBsd6RMkjVDRZzb")
+        logger.info(f"Trying ElevenLabs voice={chosen_voice} lang={lang}")
+
+        def _run() -> Optional[bytes]:
+            try:
+                # Shared client: reuses the pooled keep-alive connections
+                client = _get_client(api_key)
+                # Using streaming generator; join all chunks
+                audio_gen = client.text_to_speech.convert(
+                    voice_id=chosen_voice,
+                    output_format="mp3_44100_128",
+                    text=text,
+                    model_id="eleven_multilingual_v2" if lang != "en" else "eleven_monolingual_v1"
+                )
+                buf = b"".join(chunk for chunk in audio_gen)
+                return buf if buf else None
+            except Exception as e:  # Broad catch so we don't block other providers
+                logger.warning(f"ElevenLabs failed: {e}")
+                return None
+
+        try:
+            audio_bytes = await asyncio.to_thread(_run)
+            if audio_bytes:
+                logger.info(f"ElevenLabs SUCCESS bytes={len(audio_bytes)}")
+                return audio_bytes, "audio/mpeg"
+        except Exception as e:
+            logger.warning(f"ElevenLabs async wrapper failed: {e}")
+        return None
+
+    providers_sequence: List = []
+    if requested == "edge":
+        providers_sequence = [try_edge_tts]
+    elif requested == "gtts":
+        providers_sequence = [try_gtts]
+    elif requested == "pyttsx3":
+        providers_sequence = [try_pyttsx3]
+    elif requested == "elevenlabs":
+        providers_sequence = [try_elevenlabs]
+    else:  # auto ordering: fast/free edge first, then elevenlabs (if configured), then gTTS, then offline
+        providers_sequence = [try_edge_tts, try_elevenlabs, try_gtts, try_pyttsx3]
+
+    attempted_names: List[str] = []
+    for attempt_provider in providers_sequence:
+        name = attempt_provider.__name__.replace("try_", "")
+        attempted_names.append(name)
+        result = await attempt_provider()
+        if result:
+            audio_data, mime_type = result
+            return audio_data, mime_type, name, attempted_names, False
+
+    # If all providers failed, fall back to the precomputed beep
+    logger.warning("All TTS providers failed, returning placeholder beep")
+    return _BEEP_WAV, "audio/wav", "beep", attempted_names, True